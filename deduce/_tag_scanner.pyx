@@ -0,0 +1,129 @@
+# cython: language_level=3
+"""
+This module contains compiled versions of the tag scanning functionality in _tag_scanner_py.
+It is optional: when it is not built, the pure Python functions in _tag_scanner_py are used.
+"""
+
+
+cpdef list find_tags(str text):
+    """Finds and returns a list of all tags in a piece of text"""
+    return [tag for _, _, tag in find_tags_with_positions(text)]
+
+
+cpdef list find_tags_with_positions(str text):
+    """
+    Finds all tags in a piece of text, as (start, end, tag) triples.
+    See _tag_scanner_py.find_tags_with_positions
+    """
+
+    cdef Py_ssize_t index
+    cdef Py_ssize_t nest_depth = 0
+    cdef Py_ssize_t startpos = 0
+    cdef Py_UCS4 char
+    cdef list toflatten = []
+
+    for index in range(len(text)):
+        char = text[index]
+
+        if char == "<":
+            if nest_depth == 0:
+                startpos = index
+            nest_depth += 1
+
+        elif char == ">":
+            nest_depth -= 1
+            if nest_depth == 0:
+                toflatten.append((startpos, index + 1, text[startpos : index + 1]))
+
+    return toflatten
+
+
+cpdef list split_tags(str text):
+    """
+    Splits a text on normal text and tags, nested tags are regarded as one tag.
+    See _tag_scanner_py.split_tags
+    """
+
+    cdef Py_ssize_t index
+    cdef Py_ssize_t nest_depth = 0
+    cdef Py_ssize_t startpos = 0
+    cdef Py_UCS4 char
+    cdef list splitbytags = []
+
+    for index in range(len(text)):
+        char = text[index]
+
+        if char == "<":
+            if nest_depth == 0:
+                if index > startpos:
+                    splitbytags.append(text[startpos:index])
+                startpos = index
+            nest_depth += 1
+
+        elif char == ">":
+            nest_depth -= 1
+            if nest_depth == 0:
+                splitbytags.append(text[startpos : index + 1])
+                startpos = index + 1
+
+    if len(text) > startpos:
+        splitbytags.append(text[startpos:])
+
+    return splitbytags
+
+
+cpdef tuple flatten(str tag):
+    """
+    Flattens one tag to a tuple of name and value in a single left-to-right pass.
+    See _tag_scanner_py.flatten
+    """
+
+    cdef Py_ssize_t index = 0
+    cdef Py_ssize_t name_end
+    cdef Py_ssize_t position = 0
+    cdef Py_ssize_t length = len(tag)
+    cdef Py_UCS4 char
+    cdef list name_parts = []
+    cdef list value_parts = []
+
+    if "<" not in tag:
+        return "", tag
+
+    while index < length:
+        char = tag[index]
+
+        if char == "<":
+            value_parts.append(tag[position:index])
+
+            # The name of the tag runs up to the first space or hook
+            name_end = index + 1
+            while name_end < length and tag[name_end] not in " <>":
+                name_end += 1
+            name_parts.append(tag[index + 1 : name_end])
+
+            # Skip the space that separates the name from the value
+            index = name_end
+            if index < length and tag[index] == " ":
+                index += 1
+            position = index
+            continue
+
+        if char == ">":
+            value_parts.append(tag[position:index])
+            position = index + 1
+
+        index += 1
+
+    value_parts.append(tag[position:])
+
+    return "".join(name_parts), "".join(value_parts)
+
+
+cpdef tuple parse_tag(str tag):
+    """
+    Parse a Deduce-style tag into its tag proper and its text. Does not handle nested tags.
+    See _tag_scanner_py.parse_tag
+    """
+
+    cdef Py_ssize_t split_ix = tag.index(" ")
+    return tag[1:split_ix], tag[split_ix + 1 : len(tag) - 1]
@@ -0,0 +1,167 @@
+"""
+This module contains the pure Python versions of the tag scanning functionality, which
+utility uses when the optional compiled _tag_scanner extension has not been built
+"""
+
+import re
+
+# Matches an opening hook followed by a tag name and a space, or a closing hook
+_TAG_PART_RE = re.compile(r"<([^ <>]*) ?|>")
+
+
+def flatten(tag):
+
+    """
+    Flattens one tag to a tuple of name and value in a single left-to-right pass.
+    For example, the tag <INITIAL A <NAME Surname>> will be returned (INITIALNAME, A Surname)
+    Returns a tuple (name, value).
+    """
+
+    # Base case, where no fishhooks are present
+    if "<" not in tag:
+        return "", tag
+
+    # The names of all (nested) tags, and all text that is not part of a name or hook
+    name_parts = []
+    value_parts = []
+
+    # Position up to which the tag has been processed
+    position = 0
+
+    # Iterate over all opening hooks (including the tag name) and closing hooks
+    for match in _TAG_PART_RE.finditer(tag):
+
+        # Everything in between is part of the value
+        value_parts.append(tag[position : match.start()])
+
+        # Opening hooks are followed by the name of the (nested) tag
+        if match.group(1) is not None:
+            name_parts.append(match.group(1))
+
+        position = match.end()
+
+    value_parts.append(tag[position:])
+
+    # Return pair
+    return "".join(name_parts), "".join(value_parts)
+
+
+def find_tags(text):
+    """Finds and returns a list of all tags in a piece of text"""
+    return [tag for _, _, tag in find_tags_with_positions(text)]
+
+
+def find_tags_with_positions(text):
+    """
+    Finds all tags in a piece of text, together with their positions
+    :param text: the text in which you wish to find tags
+    :return: a list of (start, end, tag) triples, where text[start:end] == tag
+    """
+
+    # Helper variables
+    nest_depth = 0
+    startpos = 0
+
+    # Return this list
+    toflatten = []
+
+    # Positions of the next opening and closing hook, found with str.find so that
+    # all other characters are skipped
+    opening = text.find("<")
+    closing = text.find(">")
+
+    # Tags can only end at a closing hook, so stop when there are none left
+    while closing != -1:
+
+        # If an opening hook is encountered
+        if opening != -1 and opening < closing:
+
+            # If the tag is not nested, new startposition
+            if nest_depth == 0:
+                startpos = opening
+
+            # Increase nest_depth
+            nest_depth += 1
+
+            opening = text.find("<", opening + 1)
+
+        # If an closing hook is encountered
+        else:
+
+            # Always decrease nest_depth
+            nest_depth -= 1
+
+            # If the tag was not nested, add the tag to the return list
+            if nest_depth == 0:
+                toflatten.append((startpos, closing + 1, text[startpos : closing + 1]))
+
+            closing = text.find(">", closing + 1)
+
+    # Return list
+    return toflatten
+
+
+def split_tags(text):
+    """
+    Splits a text on normal text and tags, for example "This is text with a <NAME name> in it"
+    will     return: ["This is text with a ", "<NAME name>", " in it"]. Nested tags will be
+    regarded as one tag.  This function can be used on text as a whole,
+    but is more appropriately used in the value part of nested tags
+    """
+
+    # Helper variables
+    nest_depth = 0
+    startpos = 0
+
+    # Return this list
+    splitbytags = []
+
+    # Positions of the next opening and closing hook, found with str.find so that
+    # all other characters are skipped
+    opening = text.find("<")
+    closing = text.find(">")
+
+    # Iterate over all hooks
+    while opening != -1 or closing != -1:
+
+        # If an opening hook is encountered
+        if opening != -1 and (closing == -1 or opening < closing):
+
+            # Split if the tag is not nested
+            if nest_depth == 0:
+                splitbytags.append(text[startpos:opening])
+                startpos = opening
+
+            # Increase the nest_depth
+            nest_depth += 1
+
+            opening = text.find("<", opening + 1)
+
+        # If a closing hook is encountered
+        else:
+
+            # First decrease the nest_depth
+            nest_depth -= 1
+
+            # Split if the tag was not nested
+            if nest_depth == 0:
+                splitbytags.append(text[startpos : closing + 1])
+                startpos = closing + 1
+
+            closing = text.find(">", closing + 1)
+
+    # Append the last characters
+    splitbytags.append(text[startpos:])
+
+    # Filter empty elements in the list (happens for example when <tag><tag> occurs)
+    return [x for x in splitbytags if len(x) > 0]
+
+
+def parse_tag(tag: str) -> tuple:
+    """
+    Parse a Deduce-style tag into its tag proper and its text. Does not handle nested tags
+    :param tag: the Deduce-style tag, for example, <VOORNAAMONBEKEND Peter>
+    :return: the tag type and text, for example, ("VOORNAAMONBEKEND", "Peter")
+    """
+    split_ix = tag.index(" ")
+    return tag[1:split_ix], tag[split_ix + 1 : len(tag) - 1]
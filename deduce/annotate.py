@@ -229,10 +229,13 @@ def annotate_names_context(text):
             tokens, token_index
         )
 
+        # Whether the token is an initial, used by multiple patterns below
+        token_is_initial = is_initial(token)
+
         ### Initial or unknown capitalized word, detected by a name or surname that is behind it
         # If the token is an initial, or starts with a capital
         initial_condition = (
-            is_initial(token)
+            token_is_initial
             or (token != "" and token[0].isupper() and token.lower() not in WHITELIST)
         ) and (
             # And the token is followed by either a
@@ -288,7 +291,7 @@ def annotate_names_context(text):
         # If the token is an initial, or found name or prefix
         initial_name_condition = (
             (
-                is_initial(token)
+                token_is_initial
                 or "VOORNAAM" in token
                 or "ROEPNAAM" in token
                 or "PREFIX" in token
@@ -3,10 +3,15 @@ Deduce is the main module, from which the annotate and
 deidentify_annotations() methods can be imported
 """
 
+import re
+
 from deduce import utility
 from .annotate import *
 from .utility import flatten_text, flatten_text_all_phi
 
+# Matches the opening and closing hooks of tags
+_HOOK_RE = re.compile(r"[<>]")
+
 
 class NestedTagsError(Exception):
     def __init__(self, msg: str):
@@ -215,12 +220,13 @@ def annotate_text_structured(
 
 def has_nested_tags(text):
     open_brackets = 0
-    for _, ch in enumerate(text):
 
-        if ch == "<":
-            open_brackets += 1
+    # Only the hooks can change the number of open brackets, so skip all other characters
+    for match in _HOOK_RE.finditer(text):
 
-        if ch == ">":
+        if match.group() == "<":
+            open_brackets += 1
+        else:
             open_brackets -= 1
 
         if open_brackets == 2:
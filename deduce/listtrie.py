@@ -32,6 +32,26 @@ class ListTrie:
         self.root.find_all_prefixes([], prefix, 0, result)
         return result
 
+    def longest_prefix_length(self, item_list, start=0):
+        """
+        Find the length of the longest list in the ListTrie that is a prefix of
+        item_list[start:], or 0 if there is none
+        """
+
+        node = self.root
+        longest = 0
+        position = start
+
+        # Descend the ListTrie as long as the items match, remembering the last terminal node
+        while position < len(item_list) and item_list[position] in node.nodes:
+            node = node.nodes[item_list[position]]
+            position += 1
+
+            if node.is_terminal:
+                longest = position - start
+
+        return longest
+
 
 class _ListTrieNode:
     """List Trie Nodes"""
@@ -42,25 +62,23 @@ class _ListTrieNode:
         self.is_terminal = False
 
     def add(self, item_list, position):
-        """Add a list to the ListTrie by adding the current item
-        in the list to this ListTrieNode"""
+        """Add a list to the ListTrie by adding the items in the list from position onwards,
+        starting at this ListTrieNode"""
 
-        # Last position of the list, make the node terminal
-        if position == len(item_list):
-            self.is_terminal = True
-
-        # Else recurse
-        else:
+        node = self
 
-            # Current item in the list
-            current_item = item_list[position]
+        # Descend through the ListTrie one item at a time
+        for current_item in item_list[position:]:
 
             # If the item is not yet in the dictionary, create a new empty ListTrieNode
-            if current_item not in self.nodes:
-                self.nodes[current_item] = _ListTrieNode()
+            if current_item not in node.nodes:
+                node.nodes[current_item] = _ListTrieNode()
 
-            # Recurse on the ListTrieNode corresponding to the current_item
-            self.nodes[current_item].add(item_list, position + 1)
+            # Continue with the ListTrieNode corresponding to the current_item
+            node = node.nodes[current_item]
+
+        # Last position of the list, make the node terminal
+        node.is_terminal = True
 
     def print_all(self, item_list):
         """Print all lists in the ListTrie"""
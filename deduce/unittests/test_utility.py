@@ -1,17 +1,93 @@
 import codecs
 import unittest
-from unittest.mock import patch
+from unittest.mock import mock_open, patch
 
-from deduce import utility
+from deduce import _tag_scanner_py, utility
+from deduce.listtrie import ListTrie
 from deduce.utility import Annotation
 
+try:
+    from deduce import _tag_scanner
+except ImportError:
+    _tag_scanner = None
+
+# The tag scanning functions are tested for the pure Python implementation,
+# and for the compiled implementation if it has been built
+TAG_SCANNERS = [_tag_scanner_py]
+
+if _tag_scanner is not None:
+    TAG_SCANNERS.append(_tag_scanner)
+
 
 class TestUtilityMethods(unittest.TestCase):
     def test_parse_tag(self):
         tag = "<VOORNAAMONBEKEND Peter>"
-        tag_type, text = utility.parse_tag(tag)
-        self.assertEqual("VOORNAAMONBEKEND", tag_type)
-        self.assertEqual("Peter", text)
+        for scanner in TAG_SCANNERS:
+            with self.subTest(scanner=scanner.__name__):
+                tag_type, text = scanner.parse_tag(tag)
+                self.assertEqual("VOORNAAMONBEKEND", tag_type)
+                self.assertEqual("Peter", text)
+
+    def test_merge_triebased(self):
+        trie = ListTrie()
+        trie.add(["A", "1"])
+        trie.add(["van", " ", "der"])
+        trie.add(["van"])
+        tokens = [
+            "Patient",
+            " ",
+            "van",
+            " ",
+            "der",
+            " ",
+            "Berg",
+            " ",
+            "op",
+            " ",
+            "A",
+            "1",
+        ]
+        merged = utility.merge_triebased(tokens, trie)
+        self.assertEqual(
+            ["Patient", " ", "van der", " ", "Berg", " ", "op", " ", "A1"], merged
+        )
+
+    def test_type_of(self):
+        self.assertEqual("alpha", utility.type_of("a"))
+        self.assertEqual("alpha", utility.type_of("é"))
+        self.assertEqual("hook", utility.type_of("<"))
+        self.assertEqual("other", utility.type_of("1"))
+        self.assertEqual("other", utility.type_of("€"))
+
+    def test_any_in_text(self):
+        self.assertTrue(utility.any_in_text(["\n", "\r", "\t"], "regel\r\n"))
+        self.assertFalse(utility.any_in_text(["\n", "\r", "\t"], "regel"))
+        self.assertFalse(utility.any_in_text([], "regel"))
+
+    def test_any_in_text_short_circuits(self):
+        def matchlist():
+            yield "\r"
+            raise AssertionError("matchlist consumed after the first match")
+
+        self.assertTrue(utility.any_in_text(matchlist(), "regel\r\n"))
+
+    def test_context(self):
+        tokens = ["Dhr", ".", " ", "Jansen", " ", "en", "\n", "Piet"]
+        self.assertEqual(("Dhr", 0, "en", 5), utility.context(tokens, 3))
+        self.assertEqual(("", 6, "", 8), utility.context(tokens, 7))
+
+    def test_flatten_and_parse_tag_memoized(self):
+        tag = "<INSTELLING UMC <LOCATIE Utrecht>>"
+        utility.flatten(tag)
+        utility.parse_tag(tag)
+        flatten_hits = utility.flatten.cache_info().hits
+        parse_tag_hits = utility.parse_tag.cache_info().hits
+        self.assertEqual(("INSTELLINGLOCATIE", "UMC Utrecht"), utility.flatten(tag))
+        self.assertEqual(
+            ("INSTELLING", "UMC <LOCATIE Utrecht>"), utility.parse_tag(tag)
+        )
+        self.assertEqual(flatten_hits + 1, utility.flatten.cache_info().hits)
+        self.assertEqual(parse_tag_hits + 1, utility.parse_tag.cache_info().hits)
 
     def test_find_name_tags(self):
         annotated_text = (
@@ -20,7 +96,6 @@ class TestUtilityMethods(unittest.TestCase):
             "jaar oud en woonachtig in Utrecht. Hij werd op 10 oktober door arts <VOORNAAMONBEKEND "
             "Peter> <INTERFIXNAAM de Visser> ontslagen van de kliniek van het UMCU."
         )
-        found_tags = utility.find_tags(annotated_text)
         expected_tags = [
             "<VOORNAAMPAT Jan>",
             "<ACHTERNAAMPAT Jansen>",
@@ -29,7 +104,32 @@ class TestUtilityMethods(unittest.TestCase):
             "<VOORNAAMONBEKEND Peter>",
             "<INTERFIXNAAM de Visser>",
         ]
-        self.assertEqual(expected_tags, found_tags)
+        for scanner in TAG_SCANNERS:
+            with self.subTest(scanner=scanner.__name__):
+                found_tags = scanner.find_tags(annotated_text)
+                self.assertEqual(expected_tags, found_tags)
+
+    def test_split_tags(self):
+        text = "Dit is <PERSOON Jan <LOCATIE van Apeldoorn>><PERSOON Piet> hier"
+        expected = [
+            "Dit is ",
+            "<PERSOON Jan <LOCATIE van Apeldoorn>>",
+            "<PERSOON Piet>",
+            " hier",
+        ]
+        for scanner in TAG_SCANNERS:
+            with self.subTest(scanner=scanner.__name__):
+                self.assertEqual(expected, scanner.split_tags(text))
+
+    def test_find_tags_with_positions(self):
+        text = "Dit is <PERSOON Jan <LOCATIE van Apeldoorn>> en <PERSOON Piet>"
+        expected = [
+            (7, 44, "<PERSOON Jan <LOCATIE van Apeldoorn>>"),
+            (48, 62, "<PERSOON Piet>"),
+        ]
+        for scanner in TAG_SCANNERS:
+            with self.subTest(scanner=scanner.__name__):
+                self.assertEqual(expected, scanner.find_tags_with_positions(text))
 
     def test_get_annotations(self):
         text = (
@@ -90,24 +190,43 @@ class TestUtilityMethods(unittest.TestCase):
 
     def test_get_first_non_whitespace(self):
         self.assertEqual(1, utility.get_first_non_whitespace(" Overleg"))
+        self.assertEqual(0, utility.get_first_non_whitespace("Overleg "))
+        self.assertEqual(2, utility.get_first_non_whitespace("\n\t"))
 
     def test_normalize_value(self):
         ascii_str = "Something about Vincent Menger!"
         value = utility._normalize_value("¡" + ascii_str)
         self.assertEqual(ascii_str, value)
 
+    def test_normalize_value_diacritics(self):
+        self.assertEqual("Cafe Ozcan", utility._normalize_value("Café Özcan"))
+
     def test_read_list_unique(self):
         list_name = "input_file_name"
-        with patch.object(codecs, "open", return_value=["item", "item"]) as _:
+        with patch.object(codecs, "open", mock_open(read_data="item\nitem")) as _:
             read_list = utility.read_list(list_name, unique=True)
         self.assertEqual(["item"], read_list)
 
     def test_read_list_non_unique(self):
         list_name = "input_file_name"
-        with patch.object(codecs, "open", return_value=["item", "item"]) as _:
+        with patch.object(codecs, "open", mock_open(read_data="item\nitem")) as _:
             read_list = utility.read_list(list_name, unique=False)
         self.assertEqual(["item", "item"], read_list)
 
+    def test_flatten(self):
+        for scanner in TAG_SCANNERS:
+            with self.subTest(scanner=scanner.__name__):
+                self.assertEqual(
+                    ("INITIALNAMESUFFIX", "A Surname Jr"),
+                    scanner.flatten("<INITIAL A <NAME Surname <SUFFIX Jr>>>"),
+                )
+                self.assertEqual(("", "Surname"), scanner.flatten("Surname"))
+
+    def test_read_list_closes_file(self):
+        with patch.object(codecs, "open", mock_open(read_data="item")) as open_mock:
+            utility.read_list("input_file_name")
+        open_mock.return_value.__exit__.assert_called_once()
+
     def test_flatten_text_all_phi(self):
         text = "<INSTELLING UMC <LOCATIE Utrecht>>"
         flattened = utility.flatten_text_all_phi(text)
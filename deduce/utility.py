@@ -1,10 +1,35 @@
 """ This module contains all kinds of utility functionality """
 
 import codecs
+import functools
 import os
 import re
 import unicodedata
-from functools import reduce
+
+# Use the compiled tag scanning functions if the optional extension has been built,
+# and the pure Python versions otherwise
+try:
+    from . import _tag_scanner
+except ImportError:
+    from . import _tag_scanner_py as _tag_scanner
+
+# Matches two adjacent name tags, optionally separated by whitespace, period, hyphen or comma
+_ADJACENT_TAGS_RE = re.compile(
+    r"<([A-Z]+)\s([\w\.\s,]+)>([\.\s\-,]+)[\.\s]*<([A-Z]+)\s([\w\.\s,]+)>"
+)
+
+# Number of tags for which the results of flatten and parse_tag are cached,
+# tags often recur within and across texts
+_TAG_CACHE_SIZE = 4096
+
+find_tags = _tag_scanner.find_tags
+find_tags_with_positions = _tag_scanner.find_tags_with_positions
+split_tags = _tag_scanner.split_tags
+flatten = functools.lru_cache(maxsize=_TAG_CACHE_SIZE)(_tag_scanner.flatten)
+parse_tag = functools.lru_cache(maxsize=_TAG_CACHE_SIZE)(_tag_scanner.parse_tag)
+
+# Matches the characters that separate the context of a token (newline, carriage return, tab)
+_CONTEXT_BREAK_RE = re.compile(r"[\n\r\t]")
 
 
 class Annotation:
@@ -43,26 +68,25 @@ def merge_triebased(tokens, trie):
     # Iterate over tokens
     while i < len(tokens):
 
-        # Check for each item until the end if there are prefixes of the list in the Trie
-        prefix_matches = trie.find_all_prefixes(tokens[i:])
+        # Find the longest list of tokens starting at this position that is in the Trie
+        prefix_length = trie.longest_prefix_length(tokens, i)
 
         # If no prefixes are in the Trie, append the first token and move to the next one
-        if len(prefix_matches) == 0:
+        if prefix_length == 0:
             tokens_merged.append(tokens[i])
             i += 1
 
-        # Else check the maximum length list of tokens, append it to the list that will be returned,
+        # Else append the longest list of tokens to the list that will be returned,
         # and then skip all the tokens in the list
         else:
-            max_list = max(prefix_matches, key=len)
-            tokens_merged.append("".join(max_list))
-            i += len(max_list)
+            tokens_merged.append("".join(tokens[i : i + prefix_length]))
+            i += prefix_length
 
     # Return the list
     return tokens_merged
 
 
-def type_of(char):
+def _classify_char(char):
     """Determines whether a character is alpha, a fish hook, or other"""
 
     if char.isalpha():
@@ -74,55 +98,64 @@ def type_of(char):
     return "other"
 
 
+# The types of all ascii characters, which make up nearly all of the text
+_ASCII_TYPES = {chr(code): _classify_char(chr(code)) for code in range(128)}
+
+
+def type_of(char):
+    """Determines whether a character is alpha, a fish hook, or other"""
+
+    char_type = _ASCII_TYPES.get(char)
+
+    if char_type is None:
+        return _classify_char(char)
+
+    return char_type
+
+
 def any_in_text(matchlist, token):
     """Check if any of the strings in matchlist are in the string token"""
-    return reduce(lambda x, y: x | y, map(lambda x: x in token, matchlist))
+    return any(match in token for match in matchlist)
 
 
-def context(tokens, i):
-    """Determine next and previous tokens that start with an alpha character"""
-
-    # Find the next token
-    k = i + 1
-    next_token = ""
+def _scan_context(tokens, start, step, stop_char):
+    """
+    Scan the tokens from start in the direction of step (1 or -1) for the first token that
+    starts with an alpha character or is a tag. If a token starting with stop_char, or containing
+    a newline, carriage return or tab, is encountered first, no token is found.
+    Returns a tuple of the token (or "") and the last checked position.
+    """
 
-    # Iterate over tokens after this one
-    while k < len(tokens):
+    num_tokens = len(tokens)
+    k = start
 
-        # If any of these are found, no next token can be returned
-        if tokens[k][0] == ")" or any_in_text(["\n", "\r", "\t"], tokens[k]):
-            next_token = ""
-            break
+    while 0 <= k < num_tokens:
 
-        # Else, this is the next token
-        if tokens[k][0].isalpha() or tokens[k][0] == "<":
-            next_token = tokens[k]
-            break
+        token = tokens[k]
+        first_char = token[0]
 
-        # If no token is found at this position, check the next
-        k += 1
+        # If any of these are found, no token can be returned
+        if first_char == stop_char or _CONTEXT_BREAK_RE.search(token):
+            return "", k
 
-    # Index of the next token is simply the last checked position
-    next_token_index = k
+        # Else, this is the token
+        if first_char.isalpha() or first_char == "<":
+            return token, k
 
-    # Find the previous token in a similar way
-    k = i - 1
-    previous_token = ""
+        # If no token is found at this position, check the next
+        k += step
 
-    # Iterate over all previous tokens
-    while k >= 0:
+    return "", k
 
-        if tokens[k][0] == "(" or any_in_text(["\n", "\r", "\t"], tokens[k]):
-            previous_token = ""
-            break
 
-        if tokens[k][0].isalpha() or tokens[k][0] == "<":
-            previous_token = tokens[k]
-            break
+def context(tokens, i):
+    """Determine next and previous tokens that start with an alpha character"""
 
-        k -= 1
+    # Find the next token, the index of the next token is simply the last checked position
+    next_token, next_token_index = _scan_context(tokens, i + 1, 1, ")")
 
-    previous_token_index = k
+    # Find the previous token in a similar way
+    previous_token, previous_token_index = _scan_context(tokens, i - 1, -1, "(")
 
     # Return the appropriate information in a 4-tuple
     return previous_token, previous_token_index, next_token, next_token_index
@@ -144,15 +177,32 @@ def flatten_text_all_phi(text: str) -> str:
     :param text: the text in which you wish to flatten nested annotations
     :return: the text with nested annotations replaced by a single annotation with the outermost category
     """
-    to_flatten = find_tags(text)
-    to_flatten.sort(key=lambda x: -len(x))
+    flattened_parts = []
+    position = 0
 
-    for tag in to_flatten:
+    for tag_start, tag_end, tag in find_tags_with_positions(text):
+        flattened_parts.append(text[position:tag_start])
         _, value = flatten(tag)
         outermost_category = parse_tag(tag)[0]
-        text = text.replace(tag, f"<{outermost_category} {value.strip()}>")
+        flattened_parts.append(f"<{outermost_category} {value.strip()}>")
+        position = tag_end
 
-    return text
+    flattened_parts.append(text[position:])
+
+    return "".join(flattened_parts)
+
+
+def _merge_adjacent_name_tags(match):
+    """
+    Replacement for two adjacent name tags matched by _ADJACENT_TAGS_RE. If "PATIENT"
+    is in any of them they concern a patient, otherwise they concern a person
+    """
+    if "PATIENT" in match.group(1) or "PATIENT" in match.group(4):
+        tagname = "PATIENT"
+    else:
+        tagname = "PERSOON"
+
+    return f"<{tagname} {match.group(2)}{match.group(3)}{match.group(5)}>"
 
 
 def flatten_text(text):
@@ -162,14 +212,15 @@ def flatten_text(text):
     has annotated person names, and not for other PHI categories!
     """
 
-    # Find all tags and sort them by length, so that the longest tags are flattened first
-    # This makes sure that the replacing the tag with the flattened equivalent never
-    # accidentally replaces a shorter tag, for example <NAME Surname> in the example.
-    to_flatten = find_tags(text)
-    to_flatten.sort(key=lambda x: -len(x))
+    # Rebuild the text from left to right, replacing each tag by its flattened equivalent
+    flattened_parts = []
+    position = 0
+
+    # For each tag, in the order in which they appear in the text
+    for tag_start, tag_end, tag in find_tags_with_positions(text):
 
-    # For each tag
-    for tag in to_flatten:
+        # Copy the text up to the tag
+        flattened_parts.append(text[position:tag_start])
 
         # Use the flatten method to return a tuple of tagname and value
         tagname, value = flatten(tag)
@@ -181,169 +232,34 @@ def flatten_text(text):
         else:
             tagname = "PERSOON"
 
-        # Replace the found tag with the new, flattened tag
-        text = text.replace(tag, f"<{tagname} {value.strip()}>")
+        # Add the new, flattened tag
+        flattened_parts.append(f"<{tagname} {value.strip()}>")
+        position = tag_end
+
+    flattened_parts.append(text[position:])
+    text = "".join(flattened_parts)
 
     # Make sure adjacent tags are joined together (like <INITIAL A><PATIENT Surname>),
     # optionally with a whitespace, period, hyphen or comma between them.
     # This works because all adjacent tags concern names
     # (remember that the function flatten_text() can only be used for names)!
-    text = re.sub(
-        "<([A-Z]+)\s([\w\.\s,]+)>([\.\s\-,]+)[\.\s]*<([A-Z]+)\s([\w\.\s,]+)>",
-        "<\\1\\4 \\2\\3\\5>",
-        text,
-    )
-
-    # Find all names of tags, to replace them with either "PATIENT" or "PERSOON"
-    tagnames = re.findall("<([A-Z]+)", text)
-
-    # Iterate over all tags
-    for tag in tagnames:
-
-        # If "PATIENT" is in any of them, they concern a patient
-        if "PATIENT" in tag:
-            text = re.sub(tag, "PATIENT", text)
-
-        # Otherwise, they concern a person
-        else:
-            text = re.sub(tag, "PERSOON", text)
+    text = _ADJACENT_TAGS_RE.sub(_merge_adjacent_name_tags, text)
 
     # Return the text with all replacements
     return text
 
 
-def flatten(tag):
-
-    """
-    Recursively flattens one tag to a tuple of name and value using splitTag() method.
-    For example, the tag <INITIAL A <NAME Surname>> will be returned (INITIALNAME, A Surname)
-    Returns a tuple (name, value).
-    """
-
-    # Base case, where no fishhooks are present
-    if "<" not in tag:
-        return "", tag
-
-    # Remove fishhooks from tag
-    tag = tag[1:-1]
-
-    # Split on whitespaces
-    tagspl = tag.split(" ", 1)
-
-    # Split on the first whitespace, so we can distinguish between name and rest
-    tagname = tagspl[0]
-    tagrest = tagspl[1]
-
-    # Output is initially empty
-    tagvalue = ""
-
-    # Recurse on the rest of the tag
-    for tag_part in split_tags(tagrest):
-
-        # Flatten for each value in tagrest
-        flattened_tagname, flattened_tagvalue = flatten(tag_part)
-
-        # Simply append to tagnames and values
-        tagname += flattened_tagname
-        tagvalue += flattened_tagvalue
-
-    # Return pair
-    return tagname, tagvalue
-
-
-def find_tags(text):
-    """Finds and returns a list of all tags in a piece of text"""
-
-    # Helper variables
-    nest_depth = 0
-    startpos = 0
-
-    # Return this list
-    toflatten = []
-
-    # Iterate over all characters
-    for index, _ in enumerate(text):
-
-        # If an opening hook is encountered
-        if text[index] == "<":
-
-            # If the tag is not nested, new startposition
-            if nest_depth == 0:
-                startpos = index
-
-            # Increase nest_depth
-            nest_depth += 1
-
-        # If an closing hook is encountered
-        if text[index] == ">":
-
-            # Always decrease nest_depth
-            nest_depth -= 1
-
-            # If the tag was not nested, add the tag to the return list
-            if nest_depth == 0:
-                toflatten.append(text[startpos : index + 1])
-
-    # Return list
-    return toflatten
-
-
-def split_tags(text):
-    """
-    Splits a text on normal text and tags, for example "This is text with a <NAME name> in it"
-    will     return: ["This is text with a ", "<NAME name>", " in it"]. Nested tags will be
-    regarded as one tag.  This function can be used on text as a whole,
-    but is more appropriately used in the value part of nested tags
-    """
-
-    # Helper variables
-    nest_depth = 0
-    startpos = 0
-
-    # Return this list
-    splitbytags = []
-
-    # Iterate over all characters
-    for index, _ in enumerate(text):
-
-        # If an opening hook is encountered
-        if text[index] == "<":
-
-            # Split if the tag is not nested
-            if nest_depth == 0:
-                splitbytags.append(text[startpos:index])
-                startpos = index
-
-            # Increase the nest_depth
-            nest_depth += 1
-
-        # If a closing hook is encountered
-        if text[index] == ">":
-
-            # First decrease the nest_depth
-            nest_depth -= 1
-
-            # Split if the tag was not nested
-            if nest_depth == 0:
-                splitbytags.append(text[startpos : index + 1])
-                startpos = index + 1
-
-    # Append the last characters
-    splitbytags.append(text[startpos:])
-
-    # Filter empty elements in the list (happens for example when <tag><tag> occurs)
-    return [x for x in splitbytags if len(x) > 0]
-
-
 def get_data(path):
     """Define where to find the data files"""
     return os.path.join(os.path.abspath(os.path.dirname(__file__)), "data", path)
 
 
 def _normalize_value(line):
-    """Removes all non-ascii characters from a string"""
-    line = str(bytes(line, encoding="ascii", errors="ignore"), encoding="ascii")
-    return unicodedata.normalize("NFKD", line)
+    """
+    Removes all non-ascii characters from a string. Characters with diacritics are
+    first decomposed, so that their base character is kept (e.g. "é" becomes "e")
+    """
+    return unicodedata.normalize("NFKD", line).encode("ascii", "ignore").decode("ascii")
 
 
 def read_list(
@@ -357,36 +273,34 @@ def read_list(
 ):
     """Read a list from file and return the values."""
 
-    data = codecs.open(get_data(list_name), encoding=encoding)
+    with codecs.open(get_data(list_name), encoding=encoding) as data:
 
-    if normalize == "ascii":
-        data = [_normalize_value(line) for line in data]
+        values = _process_lines(data, lower, strip, min_len, normalize)
 
-    if lower:
-        data = [line.lower() for line in data]
+        if unique:
+            return list(set(values))
 
-    if strip:
-        data = [line.strip() for line in data]
+        return list(values)
 
-    if min_len:
-        data = [line for line in data if len(line) >= min_len]
 
-    if unique:
-        data_nodoubles = list(set(data))
-    else:
-        return data
+def _process_lines(lines, lower, strip, min_len, normalize):
+    """Apply all transformations to each line in one pass, and yield the lines that remain"""
 
-    return data_nodoubles
+    for line in lines:
 
+        if normalize == "ascii":
+            line = _normalize_value(line)
 
-def parse_tag(tag: str) -> tuple:
-    """
-    Parse a Deduce-style tag into its tag proper and its text. Does not handle nested tags
-    :param tag: the Deduce-style tag, for example, <VOORNAAMONBEKEND Peter>
-    :return: the tag type and text, for example, ("VOORNAAMONBEKEND", "Peter")
-    """
-    split_ix = tag.index(" ")
-    return tag[1:split_ix], tag[split_ix + 1 : len(tag) - 1]
+        if lower:
+            line = line.lower()
+
+        if strip:
+            line = line.strip()
+
+        if min_len and len(line) < min_len:
+            continue
+
+        yield line
 
 
 def get_annotations(annotated_text: str, tags: list, n_leading_whitespaces=0) -> list:
@@ -402,7 +316,12 @@ def get_annotations(annotated_text: str, tags: list, n_leading_whitespaces=0) ->
     annotations = []
     raw_text_ix = n_leading_whitespaces
     for tag in tags:
-        tag_ix = annotated_text.index(tag, ix) - ix
+        # As the tags are listed in order, the next tag starts at the next opening hook. Only if a
+        # stray opening hook precedes it, fall back to searching for the tag
+        tag_start = annotated_text.find("<", ix)
+        if tag_start == -1 or not annotated_text.startswith(tag, tag_start):
+            tag_start = annotated_text.index(tag, ix)
+        tag_ix = tag_start - ix
         tag_type, tag_text = parse_tag(tag)
         annotations.append(
             Annotation(
@@ -418,4 +337,9 @@ def get_annotations(annotated_text: str, tags: list, n_leading_whitespaces=0) ->
 
 
 def get_first_non_whitespace(text: str) -> int:
-    return text.index(text.lstrip()[0])
+    """
+    Find the index of the first non-whitespace character in a text
+    :param text: the text
+    :return: the number of leading whitespaces, or the length of the text if it only contains whitespace
+    """
+    return len(text) - len(text.lstrip())
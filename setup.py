@@ -1,6 +1,11 @@
 from os import path
 
-from setuptools import setup
+from setuptools import Extension, setup
+
+try:
+    from Cython.Build import cythonize
+except ImportError:
+    cythonize = None
 
 here = path.abspath(path.dirname(__file__))
 
@@ -11,6 +16,20 @@ with open(path.join(here, 'deduce', '__version__.py')) as fp:
 with open("README.md", "r") as fh:
     readme = fh.read()
 
+# The compiled tag scanner is optional, deduce falls back to pure Python without it
+ext_modules = []
+
+if cythonize is not None:
+    ext_modules = cythonize(
+        [Extension('deduce._tag_scanner', ['deduce/_tag_scanner.pyx'])],
+        language_level=3,
+    )
+
+    # cythonize returns new extensions without the optional flag, set it afterwards
+    # so that a missing or broken C compiler does not fail the build
+    for ext in ext_modules:
+        ext.optional = True
+
 setup(
     name='deduce',
 
@@ -32,6 +51,9 @@ setup(
     # Data files
     package_data={'deduce': ['data/*']},
 
+    # Optional compiled extensions
+    ext_modules=ext_modules,
+
     # Choose your license
     license='GNU LGPLv3',
 